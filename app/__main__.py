@@ -0,0 +1,125 @@
+import time
+
+_T0 = time.perf_counter()
+
+import argparse  # noqa: E402
+import sys  # noqa: E402
+
+def _timing(args, label: str, since: float):
+    if args.timing:
+        print(f"[timing] {label}: {(time.perf_counter() - since) * 1000:.1f} ms", file=sys.stderr)
+
+def cmd_run(args):
+    import asyncio
+    import logging
+
+    from .main import create_app
+
+    logging.basicConfig(level=logging.INFO)
+    app = create_app()
+    _timing(args, "create_app", _T0)
+    asyncio.run(app.run())
+
+def cmd_rehydrate(args):
+    # dry run of the startup scheduling: what reminder jobs would be created right now
+    import asyncio
+
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+    from . import db, jobs, runtime as rt
+    from .config import Config
+
+    problem = db.schema_problem()
+    if problem:
+        sys.exit(f"error: {problem} (run: python -m app migrate)")
+    db.READ_ONLY = True
+    rt.configure(Config.from_env())
+    rt.scheduler = AsyncIOScheduler(timezone=rt.tz)
+    asyncio.run(jobs.rehydrate())
+    counts: dict[str, int] = {}
+    for job in rt.scheduler.get_jobs():
+        kind = job.id.split(":", 1)[0]
+        counts[kind] = counts.get(kind, 0) + 1
+    for kind, n in sorted(counts.items()):
+        print(f"{kind}: {n}")
+    print(f"total: {sum(counts.values())}")
+
+def cmd_stats(args):
+    from . import db
+
+    problem = db.schema_problem()
+    if problem:
+        sys.exit(f"error: {problem} (run: python -m app migrate)")
+    for k, v in db.stats().items():
+        print(f"{k}: {v}")
+
+def cmd_migrate(args):
+    from . import db
+
+    db.init_db()
+    print(f"schema ok: {db.DB_PATH}")
+
+def cmd_backup(args):
+    from . import backup
+    from .config import Config
+
+    cfg = Config.from_env()
+    r = backup.snapshot(args.dir or cfg.backup_dir, cfg.backup_keep, cfg.backup_compress, cfg.backup_pages_per_step)
+    print(
+        f"{r.path}: {r.method}, {r.pages} pages, {r.steps} steps x {r.pages_per_step} pages, "
+        f"{r.restarts} restarts, {r.seconds:.2f}s, {r.size // 1024} KiB"
+    )
+
+def cmd_verify(args):
+    from . import backup
+
+    try:
+        info = backup.verify(args.path)
+    except FileNotFoundError as e:
+        sys.exit(f"error: {e}")
+    for k, v in info.items():
+        print(f"{k}: {v}")
+    if info["integrity"] != "ok":
+        sys.exit(1)
+
+def cmd_restore(args):
+    from . import backup
+
+    try:
+        target = backup.restore(args.path)
+    except (FileNotFoundError, RuntimeError) as e:
+        sys.exit(f"error: {e}")
+    print(f"restored {args.path} -> {target} (previous copy: {target}.pre-restore)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app")
+    parser.add_argument("--timing", action="store_true", help="print startup phase timings to stderr")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("run", help="start the bot (default)")
+    sub.add_parser("rehydrate", help="show the reminder jobs startup would schedule")
+    sub.add_parser("stats", help="row counts and page usage of the database")
+    sub.add_parser("migrate", help="create/upgrade tables and indexes")
+    p = sub.add_parser("backup", help="online snapshot of the database")
+    p.add_argument("--dir", help="snapshot directory (default BACKUP_DIR)")
+    p = sub.add_parser("verify", help="integrity_check a snapshot")
+    p.add_argument("path")
+    p = sub.add_parser("restore", help="verify a snapshot and put it in place of bot.db (stop the bot first)")
+    p.add_argument("path")
+    args = parser.parse_args(argv)
+    _timing(args, "cli import", _T0)
+
+    t = time.perf_counter()
+    {
+        "run": cmd_run,
+        "rehydrate": cmd_rehydrate,
+        "stats": cmd_stats,
+        "migrate": cmd_migrate,
+        "backup": cmd_backup,
+        "verify": cmd_verify,
+        "restore": cmd_restore,
+    }[args.command or "run"](args)
+    _timing(args, args.command or "run", t)
+    _timing(args, "total", _T0)
+
+if __name__ == "__main__":
+    main()
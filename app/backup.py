@@ -0,0 +1,154 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from . import db
+
+SNAPSHOT_PREFIX = "bot-"
+
+MAX_RESTARTS = 3
+
+@dataclass
+class BackupReport:
+    path: str
+    pages: int
+    steps: int
+    pages_per_step: int
+    seconds: float
+    size: int
+    restarts: int = 0
+    method: str = "backup"  # "backup" or "vacuum_into" (fallback after MAX_RESTARTS)
+
+class _TooManyRestarts(Exception):
+    pass
+
+def backup_to(dest: str, pages_per_step: int = 64, pause: float = 0.005, max_restarts: int = MAX_RESTARTS) -> BackupReport:
+    # SQLite online backup API, `pages_per_step` pages at a time. The database
+    # is in WAL mode (db.init_db), so neither the steps nor the fallback below
+    # hold off writers. A commit from another connection (e.g. the group-commit
+    # writer) restarts the copy from page 0; after `max_restarts` of those we
+    # give up on the incremental copy and take one consistent VACUUM INTO
+    # snapshot instead, a single read transaction on a WAL snapshot.
+    steps = 0
+    total = 0
+    restarts = 0
+    last_remaining: int | None = None
+
+    def progress(status, remaining, pagecount):
+        nonlocal steps, total, restarts, last_remaining
+        steps += 1
+        total = pagecount
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > max_restarts:
+                raise _TooManyRestarts
+        last_remaining = remaining
+        if remaining and pause:
+            time.sleep(pause)
+
+    tmp = dest + ".part"
+    t0 = time.perf_counter()
+    method = "backup"
+    src = db.connect()
+    try:
+        dst = sqlite3.connect(tmp)
+        try:
+            src.backup(dst, pages=pages_per_step, progress=progress)
+        except _TooManyRestarts:
+            dst.close()
+            os.remove(tmp)
+            src.execute("VACUUM INTO ?", (tmp,))
+            method = "vacuum_into"
+        except Exception:
+            dst.close()
+            os.remove(tmp)
+            raise
+        else:
+            dst.close()
+    finally:
+        src.close()
+    os.replace(tmp, dest)
+    if method == "vacuum_into":
+        with sqlite3.connect(dest) as conn:
+            total = conn.execute("PRAGMA page_count").fetchone()[0]
+    return BackupReport(
+        dest, total, steps, pages_per_step, time.perf_counter() - t0, os.path.getsize(dest), restarts, method,
+    )
+
+def snapshot(backup_dir: str, keep: int = 7, compress: bool = True, pages_per_step: int = 64) -> BackupReport:
+    os.makedirs(backup_dir, exist_ok=True)
+    path = os.path.join(backup_dir, f"{SNAPSHOT_PREFIX}{datetime.now():%Y%m%d-%H%M%S}.db")
+    report = backup_to(path, pages_per_step)
+    if compress:
+        with open(path, "rb") as f_in, gzip.open(path + ".gz.part", "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.replace(path + ".gz.part", path + ".gz")
+        os.remove(path)
+        report.path = path + ".gz"
+        report.size = os.path.getsize(report.path)
+    prune(backup_dir, keep)
+    return report
+
+def list_snapshots(backup_dir: str) -> list[str]:
+    if not os.path.isdir(backup_dir):
+        return []
+    names = sorted(
+        n for n in os.listdir(backup_dir)
+        if n.startswith(SNAPSHOT_PREFIX) and (n.endswith(".db") or n.endswith(".db.gz"))
+    )
+    return [os.path.join(backup_dir, n) for n in names]
+
+def prune(backup_dir: str, keep: int) -> list[str]:
+    old = list_snapshots(backup_dir)[:-keep] if keep > 0 else []
+    for path in old:
+        os.remove(path)
+    return old
+
+def _unpacked(path: str, workdir: str) -> str:
+    if not path.endswith(".gz"):
+        return path
+    out = os.path.join(workdir, os.path.basename(path)[:-3])
+    with gzip.open(path, "rb") as f_in, open(out, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    return out
+
+def verify(path: str) -> dict[str, int | str]:
+    # {"integrity": "ok", <table>: rows...}; an unreadable or non-SQLite file
+    # comes back as a failed integrity check rather than an exception
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"snapshot not found: {path}")
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            conn = sqlite3.connect(f"file:{_unpacked(path, tmp)}?mode=ro", uri=True)
+            try:
+                out: dict[str, int | str] = {"integrity": conn.execute("PRAGMA integrity_check").fetchone()[0]}
+                for t in ("users", "uni_pairs", "events"):
+                    out[t] = conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+            finally:
+                conn.close()
+        except (sqlite3.DatabaseError, gzip.BadGzipFile, EOFError) as e:
+            return {"integrity": f"error: {e}"}
+    return out
+
+def restore(path: str, target: str | None = None) -> str:
+    # the bot must be stopped: the live file is swapped underneath any open connection
+    target = target or db.DB_PATH
+    info = verify(path)
+    if info["integrity"] != "ok":
+        raise RuntimeError(f"snapshot failed integrity_check: {info['integrity']}")
+    with tempfile.TemporaryDirectory() as tmp:
+        src = _unpacked(path, tmp)
+        shutil.copyfile(src, target + ".part")
+    if os.path.exists(target):
+        shutil.copyfile(target, target + ".pre-restore")
+    # a leftover hot journal / WAL from the old file would be replayed into the restored one
+    for suffix in ("-journal", "-wal", "-shm"):
+        if os.path.exists(target + suffix):
+            os.replace(target + suffix, target + ".pre-restore" + suffix)
+    os.replace(target + ".part", target)
+    return target
@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+Handler = Callable[..., Awaitable[Any]]
+
+@dataclass(frozen=True)
+class CallbackData:
+    # "notify_uni:15m" -> prefix="notify_uni", action="15m"
+    prefix: str
+    action: str
+    args: Any = None  # what the route's parser made of action, if it has one
+
+    @classmethod
+    def parse(cls, data: str) -> "CallbackData":
+        prefix, _, action = data.partition(":")
+        return cls(prefix, action)
+
+@dataclass(frozen=True)
+class PageCursor:
+    # "next:2025-01-01T10:00:00|7" -> backward=False, values=("2025-01-01T10:00:00", 7)
+    backward: bool
+    values: tuple
+
+def page_cursor(*types: Callable[[str], Any]) -> Callable[[str], PageCursor]:
+    def parse(action: str) -> PageCursor:
+        direction, _, raw = action.partition(":")
+        parts = raw.split("|")
+        if direction not in ("prev", "next") or len(parts) != len(types):
+            raise ValueError(f"bad page cursor: {action!r}")
+        return PageCursor(direction == "prev", tuple(t(p) for t, p in zip(types, parts)))
+    return parse
+
+@dataclass(frozen=True)
+class Route:
+    handler: Handler
+    state: Any = None  # FSM state the user must be in, None = any
+    parse: Callable[[str], Any] | None = None  # raises ValueError on a malformed action
+
+class CallbackRouter:
+    # Two dict lookups per click no matter how many handlers are registered:
+    # exact (prefix, action) first, then prefix-only.
+    def __init__(self):
+        self._exact: dict[tuple[str, str], Route] = {}
+        self._prefix: dict[str, Route] = {}
+
+    def exact(self, prefix: str, action: str, state: Any = None):
+        def deco(fn: Handler) -> Handler:
+            self._exact[(prefix, action)] = Route(fn, state)
+            return fn
+        return deco
+
+    def prefix(self, prefix: str, state: Any = None, parse: Callable[[str], Any] | None = None):
+        def deco(fn: Handler) -> Handler:
+            self._prefix[prefix] = Route(fn, state, parse)
+            return fn
+        return deco
+
+    def resolve(self, data: str) -> tuple[Route, CallbackData] | None:
+        cb = CallbackData.parse(data)
+        route = self._exact.get((cb.prefix, cb.action)) or self._prefix.get(cb.prefix)
+        if route is None:
+            return None
+        if route.parse is not None:
+            try:
+                cb = CallbackData(cb.prefix, cb.action, route.parse(cb.action))
+            except ValueError:
+                return None
+        return route, cb
+
+    def __len__(self) -> int:
+        return len(self._exact) + len(self._prefix)
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+SendFn = Callable[[int, str], Awaitable[object]]
+# (user_id, window seconds) -> is another reminder for this user due within the window?
+NeighbourFn = Callable[[int, float], bool]
+
+class ReminderCoalescer:
+    # The first reminder for a user waits `grace` seconds so reminders due at the
+    # same moment (APScheduler fires them all in one pass) can join it. Then, if
+    # another reminder for that user is due within `window` seconds, the batch
+    # keeps waiting and goes out as soon as the last neighbour arrives or the
+    # window runs out. Either way the user gets one digest message, not N.
+    def __init__(
+        self, send: SendFn, window: float = 60.0, neighbour_due: NeighbourFn | None = None, grace: float = 1.0,
+    ):
+        self._send = send
+        self.window = window
+        self.grace = min(grace, window)
+        self._neighbour_due = neighbour_due
+        self._pending: dict[int, list[str]] = {}
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._held: set[int] = set()  # past the grace period, waiting on a neighbour
+
+    def _more_coming(self, user_id: int) -> bool:
+        return self._neighbour_due is not None and self._neighbour_due(user_id, self.window)
+
+    async def add(self, user_id: int, line: str):
+        metrics.inc("reminders_queued")
+        if self.window <= 0:
+            await self._deliver(user_id, [line])
+            return
+        batch = self._pending.get(user_id)
+        if batch is None:
+            self._pending[user_id] = [line]
+            self._tasks[user_id] = asyncio.create_task(self._flush_later(user_id))
+        else:
+            batch.append(line)
+            if user_id in self._held and not self._more_coming(user_id):
+                task = self._tasks.pop(user_id, None)
+                if task is not None:
+                    task.cancel()
+                self._held.discard(user_id)
+                await self._deliver(user_id, self._pending.pop(user_id))
+        metrics.set_gauge("reminders_pending_users", len(self._pending))
+
+    async def _flush_later(self, user_id: int):
+        await asyncio.sleep(self.grace)
+        if self._more_coming(user_id):
+            self._held.add(user_id)
+            await asyncio.sleep(self.window - self.grace)
+        self._held.discard(user_id)
+        self._tasks.pop(user_id, None)
+        lines = self._pending.pop(user_id, [])
+        metrics.set_gauge("reminders_pending_users", len(self._pending))
+        if lines:
+            await self._deliver(user_id, lines)
+
+    async def _deliver(self, user_id: int, lines: list[str]):
+        text = lines[0] if len(lines) == 1 else f"🔔 {len(lines)} remindere:\n\n" + "\n".join(lines)
+        try:
+            await self._send(user_id, text)
+        except Exception:
+            log.exception("reminder delivery to %s failed", user_id)
+            metrics.inc("reminder_send_errors")
+            return
+        metrics.inc("reminder_messages_sent")
+        metrics.inc("reminder_api_calls_saved", len(lines) - 1)
+
+    async def flush_all(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        self._tasks.clear()
+        self._held.clear()
+        pending, self._pending = self._pending, {}
+        metrics.set_gauge("reminders_pending_users", 0)
+        for user_id, lines in pending.items():
+            await self._deliver(user_id, lines)
@@ -0,0 +1,41 @@
+import os
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class Config:
+    bot_token: str = ""
+    tz: str = "Europe/Chisinau"
+    event_retention_days: int = 180
+    reminder_coalesce_seconds: float = 60.0
+    update_workers: int = 16
+    admin_ids: frozenset[int] = frozenset()
+    backup_dir: str = os.path.join(os.path.dirname(__file__), "..", "data", "backups")
+    backup_keep: int = 7
+    backup_compress: bool = True
+    backup_pages_per_step: int = 64
+    slow_update_ms: float = 500.0
+    profile_dir: str = os.path.join(os.path.dirname(__file__), "..", "data", "profiles")
+
+    @classmethod
+    def from_env(cls, dotenv: bool = True) -> "Config":
+        if dotenv:
+            from dotenv import load_dotenv
+            load_dotenv()
+        return cls(
+            bot_token=os.getenv("BOT_TOKEN", ""),
+            tz=os.getenv("TZ", "Europe/Chisinau"),
+            event_retention_days=int(os.getenv("EVENT_RETENTION_DAYS", "180")),
+            reminder_coalesce_seconds=float(os.getenv("REMINDER_COALESCE_SECONDS", "60")),
+            update_workers=int(os.getenv("UPDATE_WORKERS", "16")),
+            admin_ids=frozenset(int(x) for x in os.getenv("ADMIN_IDS", "").split(",") if x.strip().isdigit()),
+            backup_dir=os.getenv("BACKUP_DIR") or cls.backup_dir,
+            backup_keep=int(os.getenv("BACKUP_KEEP", "7")),
+            backup_compress=os.getenv("BACKUP_COMPRESS", "1") not in ("0", "false", "no"),
+            backup_pages_per_step=int(os.getenv("BACKUP_PAGES_PER_STEP", "64")),
+            slow_update_ms=float(os.getenv("SLOW_UPDATE_MS", "500")),
+            profile_dir=os.getenv("PROFILE_DIR") or cls.profile_dir,
+        )
+
+    def require_token(self):
+        if not self.bot_token:
+            raise RuntimeError("BOT_TOKEN lipsește. Pune-l în .env (vezi .env.example)")
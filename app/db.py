@@ -2,7 +2,11 @@ import os
 import sqlite3
 from contextlib import contextmanager
 
+from .reminders import decode_minutes, encode_minutes, reminder_minutes
+from .tracing import traced
+
 DB_PATH = os.getenv("DB_PATH", os.path.join(os.path.dirname(__file__), "..", "data", "bot.db"))
+ARCHIVE_BATCH = 500
 
 def ensure_dirs():
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
@@ -17,6 +21,7 @@ def init_db():
             language TEXT DEFAULT 'ro',
             timezone TEXT DEFAULT 'Europe/Chisinau',
             uni_notify TEXT DEFAULT '30m',
+            uni_notify_mins INTEGER DEFAULT 30,
             event_notify TEXT DEFAULT '30m',
             created_at TEXT DEFAULT CURRENT_TIMESTAMP
         );
@@ -49,57 +54,156 @@ def init_db():
             start_dt TEXT NOT NULL,
             location TEXT,
             reminders TEXT,
+            reminder_mins TEXT,
             created_at TEXT DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY(user_id) REFERENCES users(user_id) ON DELETE CASCADE
         );
         """)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS events_archive (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            start_dt TEXT NOT NULL,
+            location TEXT,
+            reminders TEXT,
+            created_at TEXT,
+            archived_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_events_start ON events(start_dt);")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_events_archive_user_start ON events_archive(user_id, start_dt, id);")
+        _migrate_reminder_offsets(conn)
+        # keyset pagination indexes: (start_dt, id) / (dow, start_time, id) per user
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_events_user_start ON events(user_id, start_dt, id);")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_pairs_user_dow ON uni_pairs(user_id, dow, start_time, id);")
         conn.commit()
+        # one-time switch so the retention job can hand freed pages back with incremental_vacuum
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+            conn.execute("VACUUM;")
+        # WAL (persistent, set once): readers such as the backup steps and
+        # VACUUM INTO no longer hold off the group-commit writer's COMMIT
+        if conn.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+            conn.execute("PRAGMA journal_mode = WAL;")
+
+# set by maintenance commands that must not modify the database (e.g. rehydrate dry run)
+READ_ONLY = False
+
+def connect(**kwargs) -> sqlite3.Connection:
+    if READ_ONLY:
+        conn = sqlite3.connect(f"file:{os.path.abspath(DB_PATH)}?mode=ro", uri=True, **kwargs)
+    else:
+        ensure_dirs()
+        conn = sqlite3.connect(DB_PATH, **kwargs)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    return conn
+
+def schema_problem() -> str | None:
+    # None when DB_PATH exists and has the current schema; otherwise why not
+    if not os.path.isfile(DB_PATH):
+        return f"database not found: {DB_PATH}"
+    conn = sqlite3.connect(f"file:{os.path.abspath(DB_PATH)}?mode=ro", uri=True)
+    try:
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        missing = [t for t in ("users", "job_anchor", "uni_pairs", "events", "events_archive") if t not in tables]
+        if missing:
+            return f"schema missing tables: {', '.join(missing)}"
+        if "reminder_mins" not in {r[1] for r in conn.execute("PRAGMA table_info(events)")} or \
+                "uni_notify_mins" not in {r[1] for r in conn.execute("PRAGMA table_info(users)")}:
+            return "schema is out of date"
+    except sqlite3.DatabaseError as e:
+        return f"cannot read {DB_PATH}: {e}"
+    finally:
+        conn.close()
+    return None
+
+def _migrate_reminder_offsets(conn: sqlite3.Connection):
+    # pre-offsets databases: add the integer-minute columns and backfill them once
+    if "uni_notify_mins" not in {r[1] for r in conn.execute("PRAGMA table_info(users)")}:
+        conn.execute("ALTER TABLE users ADD COLUMN uni_notify_mins INTEGER DEFAULT 30")
+        for user_id, val in conn.execute("SELECT user_id, uni_notify FROM users").fetchall():
+            conn.execute("UPDATE users SET uni_notify_mins=? WHERE user_id=?", (_uni_lead(val), user_id))
+    if "reminder_mins" not in {r[1] for r in conn.execute("PRAGMA table_info(events)")}:
+        conn.execute("ALTER TABLE events ADD COLUMN reminder_mins TEXT")
+        for event_id, val in conn.execute("SELECT id, reminders FROM events WHERE reminders IS NOT NULL").fetchall():
+            conn.execute("UPDATE events SET reminder_mins=? WHERE id=?", (encode_minutes(reminder_minutes(val)), event_id))
+
+def _uni_lead(val: str | None) -> int | None:
+    # uni reminders use the longest lead only; NULL means off
+    mins = reminder_minutes(val or "30m")
+    return mins[0] if mins else None
 
 @contextmanager
 def get_conn():
-    ensure_dirs()
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     try:
-        conn.execute("PRAGMA foreign_keys = ON;")
         yield conn
         conn.commit()
     finally:
         conn.close()
 
+# *_tx helpers run inside a caller-owned transaction (see app/writer.py);
+# the plain versions below commit on their own.
+def ensure_user_tx(conn: sqlite3.Connection, user_id: int, tz: str = "Europe/Chisinau"):
+    conn.execute("INSERT OR IGNORE INTO users(user_id, timezone) VALUES(?, ?)", (user_id, tz))
+
+@traced("db.ensure_user")
 def ensure_user(user_id: int, tz: str = "Europe/Chisinau"):
     with get_conn() as conn:
-        conn.execute("INSERT OR IGNORE INTO users(user_id, timezone) VALUES(?, ?)", (user_id, tz))
+        ensure_user_tx(conn, user_id, tz)
 
+@traced("db.get_user_settings")
 def get_user_settings(user_id: int):
     with get_conn() as conn:
         row = conn.execute("SELECT timezone, uni_notify, event_notify FROM users WHERE user_id=?", (user_id,)).fetchone()
         return row if row else ("Europe/Chisinau", "30m", "30m")
 
+def set_user_uni_notify_tx(conn: sqlite3.Connection, user_id: int, val: str):
+    mins = reminder_minutes(val, strict=True)
+    lead = mins[0] if mins else None
+    conn.execute("UPDATE users SET uni_notify=?, uni_notify_mins=? WHERE user_id=?", (val, lead, user_id))
+
+@traced("db.set_user_uni_notify")
 def set_user_uni_notify(user_id: int, val: str):
     with get_conn() as conn:
-        conn.execute("UPDATE users SET uni_notify=? WHERE user_id=?", (val, user_id))
+        set_user_uni_notify_tx(conn, user_id, val)
+
+def set_user_event_notify_tx(conn: sqlite3.Connection, user_id: int, val: str):
+    reminder_minutes(val, strict=True)
+    conn.execute("UPDATE users SET event_notify=? WHERE user_id=?", (val, user_id))
 
+@traced("db.set_user_event_notify")
 def set_user_event_notify(user_id: int, val: str):
     with get_conn() as conn:
-        conn.execute("UPDATE users SET event_notify=? WHERE user_id=?", (val, user_id))
+        set_user_event_notify_tx(conn, user_id, val)
 
+def set_job_anchor_tx(conn: sqlite3.Connection, user_id: int, anchor_date: str):
+    conn.execute("INSERT OR REPLACE INTO job_anchor(user_id, anchor_date) VALUES(?, ?)", (user_id, anchor_date))
+
+@traced("db.set_job_anchor")
 def set_job_anchor(user_id: int, anchor_date: str):
     with get_conn() as conn:
-        conn.execute("INSERT OR REPLACE INTO job_anchor(user_id, anchor_date) VALUES(?, ?)", (user_id, anchor_date))
+        set_job_anchor_tx(conn, user_id, anchor_date)
 
+@traced("db.get_job_anchor")
 def get_job_anchor(user_id: int):
     with get_conn() as conn:
         row = conn.execute("SELECT anchor_date FROM job_anchor WHERE user_id=?", (user_id,)).fetchone()
         return row[0] if row else None
 
+def add_pair_tx(conn: sqlite3.Connection, user_id: int, dow: str, start_time: str, end_time: str, subject: str, room: str | None) -> int:
+    return conn.execute(
+        "INSERT INTO uni_pairs(user_id, dow, start_time, end_time, subject, room) VALUES(?,?,?,?,?,?)",
+        (user_id, dow, start_time, end_time, subject, room),
+    ).lastrowid
+
+@traced("db.add_pair")
 def add_pair(user_id: int, dow: str, start_time: str, end_time: str, subject: str, room: str | None):
     with get_conn() as conn:
-        conn.execute(
-            "INSERT INTO uni_pairs(user_id, dow, start_time, end_time, subject, room) VALUES(?,?,?,?,?,?)",
-            (user_id, dow, start_time, end_time, subject, room),
-        )
-        return conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        return add_pair_tx(conn, user_id, dow, start_time, end_time, subject, room)
 
+@traced("db.list_pairs")
 def list_pairs(user_id: int):
     with get_conn() as conn:
         return conn.execute(
@@ -107,32 +211,59 @@ def list_pairs(user_id: int):
             (user_id,),
         ).fetchall()
 
+@traced("db.list_pairs_page")
+def list_pairs_page(user_id: int, cursor: tuple[str, str, int] | None = None, limit: int = 10, backward: bool = False):
+    q = "SELECT id, dow, start_time, end_time, subject, COALESCE(room,'') FROM uni_pairs WHERE user_id=?"
+    params = [user_id]
+    if cursor:
+        q += " AND (dow, start_time, id) < (?,?,?)" if backward else " AND (dow, start_time, id) > (?,?,?)"
+        params.extend(cursor)
+    q += " ORDER BY dow DESC, start_time DESC, id DESC LIMIT ?" if backward else " ORDER BY dow, start_time, id LIMIT ?"
+    params.append(limit)
+    with get_conn() as conn:
+        rows = conn.execute(q, tuple(params)).fetchall()
+    return rows[::-1] if backward else rows
+
+def delete_pair_tx(conn: sqlite3.Connection, user_id: int, pair_id: int) -> bool:
+    return conn.execute("DELETE FROM uni_pairs WHERE user_id=? AND id=?", (user_id, pair_id)).rowcount > 0
+
+@traced("db.delete_pair")
 def delete_pair(user_id: int, pair_id: int) -> bool:
     with get_conn() as conn:
-        cur = conn.execute("DELETE FROM uni_pairs WHERE user_id=? AND id=?", (user_id, pair_id))
-        return cur.rowcount > 0
+        return delete_pair_tx(conn, user_id, pair_id)
+
+def clear_pairs_tx(conn: sqlite3.Connection, user_id: int) -> int:
+    return conn.execute("DELETE FROM uni_pairs WHERE user_id=?", (user_id,)).rowcount
 
+@traced("db.clear_pairs")
 def clear_pairs(user_id: int) -> int:
     with get_conn() as conn:
-        cur = conn.execute("DELETE FROM uni_pairs WHERE user_id=?", (user_id,))
-        return cur.rowcount
+        return clear_pairs_tx(conn, user_id)
 
+def update_pair_tx(conn: sqlite3.Connection, user_id: int, pair_id: int, dow: str, start_time: str, end_time: str, subject: str, room: str | None) -> bool:
+    return conn.execute(
+        "UPDATE uni_pairs SET dow=?, start_time=?, end_time=?, subject=?, room=? WHERE user_id=? AND id=?",
+        (dow, start_time, end_time, subject, room, user_id, pair_id),
+    ).rowcount > 0
+
+@traced("db.update_pair")
 def update_pair(user_id: int, pair_id: int, dow: str, start_time: str, end_time: str, subject: str, room: str | None) -> bool:
     with get_conn() as conn:
-        cur = conn.execute(
-            "UPDATE uni_pairs SET dow=?, start_time=?, end_time=?, subject=?, room=? WHERE user_id=? AND id=?",
-            (dow, start_time, end_time, subject, room, user_id, pair_id),
-        )
-        return cur.rowcount > 0
+        return update_pair_tx(conn, user_id, pair_id, dow, start_time, end_time, subject, room)
+
+def add_event_tx(conn: sqlite3.Connection, user_id: int, title: str, start_iso: str, location: str | None, reminders: str | None) -> int:
+    mins = encode_minutes(reminder_minutes(reminders, strict=True))
+    return conn.execute(
+        "INSERT INTO events(user_id, title, start_dt, location, reminders, reminder_mins) VALUES(?,?,?,?,?,?)",
+        (user_id, title, start_iso, location, reminders, mins),
+    ).lastrowid
 
+@traced("db.add_event")
 def add_event(user_id: int, title: str, start_iso: str, location: str | None, reminders: str | None):
     with get_conn() as conn:
-        conn.execute(
-            "INSERT INTO events(user_id, title, start_dt, location, reminders) VALUES(?,?,?,?,?)",
-            (user_id, title, start_iso, location, reminders),
-        )
-        return conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        return add_event_tx(conn, user_id, title, start_iso, location, reminders)
 
+@traced("db.list_events")
 def list_events(user_id: int, from_iso: str | None = None, to_iso: str | None = None):
     q = "SELECT id, title, start_dt, COALESCE(location,''), COALESCE(reminders,'') FROM events WHERE user_id=?"
     params = [user_id]
@@ -146,6 +277,39 @@ def list_events(user_id: int, from_iso: str | None = None, to_iso: str | None =
     with get_conn() as conn:
         return conn.execute(q, tuple(params)).fetchall()
 
+@traced("db.list_events_page")
+def list_events_page(user_id: int, cursor: tuple[str, int] | None = None, limit: int = 10, backward: bool = False):
+    q = "SELECT id, title, start_dt, COALESCE(location,''), COALESCE(reminders,'') FROM events WHERE user_id=?"
+    params = [user_id]
+    if cursor:
+        q += " AND (start_dt, id) < (?,?)" if backward else " AND (start_dt, id) > (?,?)"
+        params.extend(cursor)
+    q += " ORDER BY start_dt DESC, id DESC LIMIT ?" if backward else " ORDER BY start_dt, id LIMIT ?"
+    params.append(limit)
+    with get_conn() as conn:
+        rows = conn.execute(q, tuple(params)).fetchall()
+    return rows[::-1] if backward else rows
+
+@traced("db.list_events_around")
+def list_events_around(user_id: int, cursor: tuple[str, int], limit: int = 10):
+    # up to `limit` rows on each side of cursor in one statement (two index range
+    # scans); returns (before, after), both in ascending order
+    sel = (
+        "SELECT id, title, start_dt, COALESCE(location,''), COALESCE(reminders,''), {side} FROM events"
+        " WHERE user_id=? AND (start_dt, id) {op} (?,?)"
+    )
+    q = (
+        f"SELECT * FROM ({sel.format(side=0, op='<')} ORDER BY start_dt DESC, id DESC LIMIT ?)"
+        f" UNION ALL SELECT * FROM ({sel.format(side=1, op='>')} ORDER BY start_dt, id LIMIT ?)"
+    )
+    with get_conn() as conn:
+        rows = conn.execute(q, (user_id, *cursor, limit, user_id, *cursor, limit)).fetchall()
+    rows.sort(key=lambda r: (r[2], r[0]))
+    before = [r[:5] for r in rows if r[5] == 0]
+    after = [r[:5] for r in rows if r[5] == 1]
+    return before, after
+
+@traced("db.get_event")
 def get_event(user_id: int, event_id: int):
     with get_conn() as conn:
         return conn.execute(
@@ -153,7 +317,84 @@ def get_event(user_id: int, event_id: int):
             (user_id, event_id),
         ).fetchone()
 
+@traced("db.get_event_offsets")
+def get_event_offsets(user_id: int, event_id: int) -> tuple[str, tuple[int, ...]] | None:
+    with get_conn() as conn:
+        row = conn.execute(
+            "SELECT start_dt, reminder_mins FROM events WHERE user_id=? AND id=?", (user_id, event_id)
+        ).fetchone()
+    return (row[0], decode_minutes(row[1])) if row else None
+
+@traced("db.list_upcoming_event_offsets")
+def list_upcoming_event_offsets(from_iso: str) -> list[tuple[int, int, str, tuple[int, ...]]]:
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT user_id, id, start_dt, reminder_mins FROM events WHERE start_dt>=? AND reminder_mins IS NOT NULL",
+            (from_iso,),
+        ).fetchall()
+    return [(uid, eid, start, decode_minutes(mins)) for uid, eid, start, mins in rows]
+
+@traced("db.list_uni_leads")
+def list_uni_leads() -> list[tuple[int, str, int]]:
+    with get_conn() as conn:
+        return conn.execute(
+            "SELECT user_id, timezone, uni_notify_mins FROM users WHERE uni_notify_mins IS NOT NULL"
+        ).fetchall()
+
+def delete_event_tx(conn: sqlite3.Connection, user_id: int, event_id: int) -> bool:
+    return conn.execute("DELETE FROM events WHERE user_id=? AND id=?", (user_id, event_id)).rowcount > 0
+
+@traced("db.delete_event")
 def delete_event(user_id: int, event_id: int) -> bool:
     with get_conn() as conn:
-        cur = conn.execute("DELETE FROM events WHERE user_id=? AND id=?", (user_id, event_id))
-        return cur.rowcount > 0
+        return delete_event_tx(conn, user_id, event_id)
+
+@traced("db.archive_events_before")
+def archive_events_before(cutoff_iso: str, batch: int = ARCHIVE_BATCH) -> int:
+    moved = 0
+    while True:
+        with get_conn() as conn:
+            ids = [r[0] for r in conn.execute(
+                "SELECT id FROM events WHERE start_dt<? ORDER BY start_dt LIMIT ?", (cutoff_iso, batch)
+            ).fetchall()]
+            if not ids:
+                return moved
+            marks = ",".join("?" * len(ids))
+            conn.execute(
+                "INSERT OR REPLACE INTO events_archive(id, user_id, title, start_dt, location, reminders, created_at) "
+                f"SELECT id, user_id, title, start_dt, location, reminders, created_at FROM events WHERE id IN ({marks})",
+                ids,
+            )
+            conn.execute(f"DELETE FROM events WHERE id IN ({marks})", ids)
+        moved += len(ids)
+
+@traced("db.list_archived_events")
+def list_archived_events(user_id: int, limit: int = 20):
+    with get_conn() as conn:
+        return conn.execute(
+            "SELECT id, title, start_dt, COALESCE(location,''), COALESCE(reminders,'') FROM events_archive "
+            "WHERE user_id=? ORDER BY start_dt DESC, id DESC LIMIT ?",
+            (user_id, limit),
+        ).fetchall()
+
+@traced("db.vacuum_and_analyze")
+def vacuum_and_analyze() -> tuple[int, int]:
+    with get_conn() as conn:
+        free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # executescript steps the pragma to completion; execute() frees a single page
+        conn.executescript("PRAGMA incremental_vacuum;")
+        conn.execute("ANALYZE;")
+        free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return free_before - free_after, page_size
+
+@traced("db.stats")
+def stats() -> dict[str, int]:
+    with get_conn() as conn:
+        out = {
+            t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+            for t in ("users", "uni_pairs", "events", "events_archive")
+        }
+        for pragma in ("page_count", "freelist_count", "page_size"):
+            out[pragma] = conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+    return out
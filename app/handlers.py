@@ -0,0 +1,687 @@
+import asyncio
+import contextvars
+import html
+from datetime import datetime, date, time, timedelta
+
+from aiogram import F, Router
+from aiogram.filters import Command
+from aiogram.types import Message, CallbackQuery
+from aiogram.fsm.context import FSMContext
+
+from . import db, metrics, runtime as rt
+from .callbacks import CallbackData, CallbackRouter, page_cursor
+from .intervals import DOWS, EVENT_DEFAULT_DURATION, IntervalIndex, WeekIndexCache
+from .jobs import schedule_event_reminders
+from .writer import read, write
+from .schedule_logic import week_range, shift_for_date
+from .ui import main_menu_kb, reminder_kb, dow_kb, settings_kb, delete_kb, uni_menu_kb, pager_kb
+from .states import JobStart, AddEvent, UniWizard, DeleteById
+from .tracing import profile_for, span
+
+router = Router(name="bot")
+callback_router = CallbackRouter()
+week_cache = WeekIndexCache()
+
+PAGE_SIZE = 10
+DAY_NAMES = ["Lu","Ma","Mi","Jo","Vi","Sa","Du"]
+FREE_DAY_START = time(8, 0)
+FREE_DAY_END = time(22, 0)
+
+_background: set[asyncio.Task] = set()
+
+def fmt_shift(kind: str) -> str:
+    return {
+        "WORK_DAY": "🟡 Job (Zi 07:00–19:00)",
+        "WORK_NIGHT": "🔵 Job (Noapte 19:00–07:00)",
+        "OFF_DAY_1": "🟢 Liber (Zi liberă 1)",
+        "OFF_DAY_2": "🟢 Liber (Zi liberă 2)",
+    }.get(kind, kind)
+
+async def ensure_user_from_msg(message: Message) -> int:
+    user_id = message.from_user.id
+    await write(db.ensure_user_tx, user_id, rt.config.tz)
+    return user_id
+
+async def ensure_anchor(user_id: int) -> str:
+    anchor = await read(db.get_job_anchor, user_id)
+    if not anchor:
+        today = datetime.now(rt.tz).date().isoformat()
+        await write(db.set_job_anchor_tx, user_id, today)
+        anchor = today
+    return anchor
+
+async def week_index(user_id: int, week_start: date) -> IntervalIndex:
+    idx = week_cache.get(user_id, week_start)
+    if idx is None:
+        anchor = date.fromisoformat(await ensure_anchor(user_id))
+        first = datetime.combine(week_start, time.min) - EVENT_DEFAULT_DURATION
+        last = datetime.combine(week_start + timedelta(days=6), time.max)
+        events = await read(
+            db.list_events,
+            user_id,
+            from_iso=first.isoformat(timespec="seconds"),
+            to_iso=last.isoformat(timespec="seconds"),
+        )
+        pairs = await read(db.list_pairs, user_id)
+        idx = IntervalIndex.build(anchor, week_start, pairs, events)
+        week_cache.put(user_id, week_start, idx)
+    return idx
+
+async def find_conflicts(user_id: int, start: datetime, end: datetime, kinds: tuple[str, ...] = ("shift", "pair", "event"), skip=None):
+    idx = await week_index(user_id, week_range(start.date())[0])
+    return [iv for iv in idx.overlapping(start, end) if iv.kind in kinds and (iv.kind, iv.ref) != skip]
+
+def fmt_conflicts(conflicts) -> str:
+    lines = ["⚠️ Se suprapune cu:"]
+    for iv in conflicts:
+        if iv.kind == "shift":
+            lines.append(fmt_shift(iv.label))
+        elif iv.kind == "pair":
+            lines.append(f"🎓 #{iv.ref} {iv.start:%H:%M}-{iv.end:%H:%M} {iv.label}")
+        else:
+            lines.append(f"📌 #{iv.ref} {iv.start:%Y-%m-%d %H:%M} {iv.label}")
+    return "\n".join(lines)
+
+def _valid_time(t: str) -> bool:
+    try:
+        datetime.strptime(t, "%H:%M")
+        return True
+    except ValueError:
+        return False
+
+# ---------- Callback routing ----------
+# All inline buttons go through one filter + dict lookup (see app/callbacks.py)
+# instead of a chain of F.data filters evaluated one by one.
+def _resolve_callback(callback: CallbackQuery):
+    hit = callback_router.resolve(callback.data or "")
+    return {"route": hit} if hit else False
+
+@router.callback_query(_resolve_callback)
+async def route_callback(callback: CallbackQuery, state: FSMContext, route):
+    handler_route, cb = route
+    if handler_route.state is not None and await state.get_state() != handler_route.state.state:
+        await callback.answer()
+        return
+    await handler_route.handler(callback, state, cb)
+
+# ---------- START / HELP ----------
+@router.message(Command("start"))
+async def cmd_start(message: Message):
+    user_id = await ensure_user_from_msg(message)
+    anchor = await ensure_anchor(user_id)
+    _, uni_n, ev_n = await read(db.get_user_settings, user_id)
+    await message.answer(
+        "✅ Bot pornit.\n"
+        f"📌 Job start date (WORK_DAY): {anchor}\n"
+        f"🔔 Uni notify: {uni_n} | Event default: {ev_n}\n"
+        "Ciclu: DAY → NIGHT → OFF1 → OFF2 → repeat.\n\n"
+        "Alege din butoane 👇",
+        reply_markup=main_menu_kb(),
+    )
+
+@router.message(Command("help"))
+@router.message(F.text == "ℹ️ Help")
+async def cmd_help(message: Message):
+    await message.answer(
+        "🆘 Ajutor\n\n"
+        "📅 Calendar – arată săptămâna\n"
+        "🧰 Set job start date – setezi data (WORK_DAY)\n"
+        "🎓 Uni schedule – add/list/edit/delete/clear\n"
+        "➕ Add event – adaugi eveniment cu reminder\n"
+        "🔔 Notification settings – setezi notificări (uni + events)\n"
+        "🗑 Delete – ștergere după ID\n\n"
+        "Comenzi rapide:\n"
+        "/events – lista evenimentelor (pe pagini)\n"
+        "/archive – evenimente vechi arhivate\n"
+        "/free [min] – când ești liber săptămâna asta\n"
+        "/deleteevent ID\n"
+        "/deletepair ID\n"
+        "/clearpairs\n",
+        reply_markup=main_menu_kb(),
+    )
+
+# ---------- Calendar ----------
+@router.message(Command("calendar"))
+@router.message(F.text == "📅 Calendar")
+async def calendar_view(message: Message):
+    user_id = await ensure_user_from_msg(message)
+    anchor = date.fromisoformat(await ensure_anchor(user_id))
+
+    today = datetime.now(rt.tz).date()
+    start, end = week_range(today)
+    # same cached index as /free and the conflict checks, so writes invalidate it once
+    idx = await week_index(user_id, start)
+
+    with span("render.calendar"):
+        by_day = {}
+        for iv in idx.intervals:
+            if iv.kind != "shift" and start <= iv.start.date() <= end:
+                by_day.setdefault(iv.start.date(), []).append(iv)
+
+        lines = [f"📅 Săptămâna: {start.isoformat()} → {end.isoformat()}"]
+        for i in range(7):
+            d = start + timedelta(days=i)
+            shift = shift_for_date(anchor, d)
+            lines.append(f"\n<b>{d.isoformat()}</b> ({DAY_NAMES[d.weekday()]})")
+            lines.append(fmt_shift(shift.kind))
+
+            for iv in by_day.get(d, ()):
+                if iv.kind == "pair":
+                    room_txt = f" ({iv.detail})" if iv.detail else ""
+                    lines.append(f"🎓 #{iv.ref} {iv.start:%H:%M}-{iv.end:%H:%M} {iv.label}{room_txt}")
+                else:
+                    lines.append(f"📌 {iv.start:%H:%M} {iv.label}")
+
+    await message.answer("\n".join(lines), parse_mode="HTML", reply_markup=main_menu_kb())
+
+@router.message(Command("free"))
+async def cmd_free(message: Message):
+    user_id = await ensure_user_from_msg(message)
+    parts = (message.text or "").split()
+    # 0 would list zero-length gaps between back-to-back blocks; nothing fits past the day window
+    day_minutes = (datetime.combine(date.min, FREE_DAY_END) - datetime.combine(date.min, FREE_DAY_START)).seconds // 60
+    min_minutes = min(max(int(parts[1]), 1), day_minutes) if len(parts) > 1 and parts[1].isdigit() else 60
+    min_len = timedelta(minutes=min_minutes)
+
+    now = datetime.now(rt.tz).replace(tzinfo=None, second=0, microsecond=0)
+    start, end = week_range(now.date())
+    idx = await week_index(user_id, start)
+
+    lines = [f"🕊 Timp liber (≥ {min_minutes} min), {FREE_DAY_START:%H:%M}–{FREE_DAY_END:%H:%M}:"]
+    for i in range((end - now.date()).days + 1):
+        d = now.date() + timedelta(days=i)
+        lo = max(datetime.combine(d, FREE_DAY_START), now)
+        hi = datetime.combine(d, FREE_DAY_END)
+        if lo >= hi:
+            continue
+        slots = idx.free_slots(lo, hi, min_len)
+        if slots:
+            lines.append(f"\n<b>{d.isoformat()}</b> ({DAY_NAMES[d.weekday()]})")
+            lines.extend(f"🟢 {s:%H:%M}–{e:%H:%M}" for s, e in slots)
+    if len(lines) == 1:
+        lines.append("Nimic liber săptămâna asta 😅")
+    await message.answer("\n".join(lines), parse_mode="HTML", reply_markup=main_menu_kb())
+
+# ---------- Job start date ----------
+@router.message(F.text == "🧰 Set job start date")
+async def set_job_start(message: Message, state: FSMContext):
+    await ensure_user_from_msg(message)
+    await state.set_state(JobStart.waiting_date)
+    await message.answer(
+        "📌 Trimite data de start pentru grafic (WORK_DAY).\n"
+        "Format: <b>YYYY-MM-DD</b> (ex: <b>2026-02-04</b>)",
+        parse_mode="HTML",
+    )
+
+@router.message(JobStart.waiting_date)
+async def job_start_date_input(message: Message, state: FSMContext):
+    user_id = await ensure_user_from_msg(message)
+    txt = (message.text or "").strip()
+    try:
+        d = date.fromisoformat(txt)
+    except ValueError:
+        await message.answer("❌ Data invalidă. Exemplu: 2026-02-04")
+        return
+    await write(db.set_job_anchor_tx, user_id, d.isoformat())
+    week_cache.invalidate(user_id)
+    await state.clear()
+    await message.answer(f"✅ Setat! Job start date (WORK_DAY) = {d.isoformat()}", reply_markup=main_menu_kb())
+
+# ---------- Notification settings (FIXED prefixes) ----------
+@router.message(F.text == "🔔 Notification settings")
+async def notif_settings(message: Message):
+    user_id = await ensure_user_from_msg(message)
+    _, uni_n, ev_n = await read(db.get_user_settings, user_id)
+    await message.answer(
+        f"🔔 Setări notificări\n\n"
+        f"🎓 Uni notify: <b>{uni_n}</b>\n"
+        f"📌 Event default: <b>{ev_n}</b>\n\n"
+        "Alege ce vrei să schimbi:",
+        parse_mode="HTML",
+        reply_markup=settings_kb(),
+    )
+
+@callback_router.exact("set", "uni")
+async def pick_uni_notify(callback: CallbackQuery, state: FSMContext, cb: CallbackData):
+    user_id = callback.from_user.id
+    await write(db.ensure_user_tx, user_id, rt.config.tz)
+    await callback.message.answer(
+        "Alege cu cât timp înainte pentru perechi (universitate):",
+        reply_markup=reminder_kb("notify_uni"),
+    )
+    await callback.answer()
+
+@callback_router.exact("set", "event")
+async def pick_event_default(callback: CallbackQuery, state: FSMContext, cb: CallbackData):
+    user_id = callback.from_user.id
+    await write(db.ensure_user_tx, user_id, rt.config.tz)
+    await callback.message.answer(
+        "Alege default reminder pentru evenimente noi:",
+        reply_markup=reminder_kb("notify_evd"),
+    )
+    await callback.answer()
+
+@callback_router.prefix("notify_uni")
+async def set_uni_notify(callback: CallbackQuery, state: FSMContext, cb: CallbackData):
+    user_id = callback.from_user.id
+    await write(db.ensure_user_tx, user_id, rt.config.tz)
+    val = cb.action
+    await write(db.set_user_uni_notify_tx, user_id, val)
+    await callback.message.answer(f"✅ Uni notify setat: <b>{val}</b>", parse_mode="HTML", reply_markup=main_menu_kb())
+    await callback.answer()
+
+@callback_router.prefix("notify_evd")
+async def set_event_default(callback: CallbackQuery, state: FSMContext, cb: CallbackData):
+    user_id = callback.from_user.id
+    await write(db.ensure_user_tx, user_id, rt.config.tz)
+    val = cb.action
+    await write(db.set_user_event_notify_tx, user_id, val)
+    await callback.message.answer(f"✅ Event default setat: <b>{val}</b>", parse_mode="HTML", reply_markup=main_menu_kb())
+    await callback.answer()
+
+# ---------- Add event ----------
+@router.message(F.text == "➕ Add event")
+async def add_event_start(message: Message, state: FSMContext):
+    await ensure_user_from_msg(message)
+    await state.set_state(AddEvent.waiting_title)
+    await message.answer("➕ Scrie titlul evenimentului (ex: Barber):")
+
+@router.message(AddEvent.waiting_title)
+async def add_event_title(message: Message, state: FSMContext):
+    title = (message.text or "").strip()
+    if not title:
+        await message.answer("❌ Titlul nu poate fi gol. Scrie ex: Barber")
+        return
+    await state.update_data(title=title)
+    await state.set_state(AddEvent.waiting_datetime)
+    await message.answer(
+        "Acum trimite doar <b>data și ora</b>.\n"
+        "Format: <b>YYYY-MM-DD HH:MM</b> (ex: <b>2026-02-05 16:00</b>)",
+        parse_mode="HTML",
+    )
+
+@router.message(AddEvent.waiting_datetime)
+async def add_event_datetime(message: Message, state: FSMContext):
+    user_id = await ensure_user_from_msg(message)
+    txt = (message.text or "").strip()
+    try:
+        dt = datetime.strptime(txt, "%Y-%m-%d %H:%M")
+    except ValueError:
+        await message.answer("❌ Format invalid. Exemplu: 2026-02-05 16:00")
+        return
+    await state.update_data(dt=dt.isoformat(timespec="seconds"))
+    _, _, default_ev = await read(db.get_user_settings, user_id)
+    await state.set_state(AddEvent.waiting_reminder)
+    conflicts = await find_conflicts(user_id, dt, dt + EVENT_DEFAULT_DURATION)
+    warn = fmt_conflicts(conflicts) + "\n\n" if conflicts else ""
+    await message.answer(
+        f"{warn}🔔 Reminder pentru acest event? (default: {default_ev})",
+        reply_markup=reminder_kb("ev"),
+    )
+
+@callback_router.prefix("ev", state=AddEvent.waiting_reminder)
+async def add_event_reminder(callback: CallbackQuery, state: FSMContext, cb: CallbackData):
+    user_id = callback.from_user.id
+    await write(db.ensure_user_tx, user_id, rt.config.tz)
+
+    chosen = cb.action
+    data = await state.get_data()
+    title = data["title"]
+    start_iso = data["dt"]
+
+    reminders = None if chosen == "off" else chosen
+
+    event_id = await write(db.add_event_tx, user_id, title, start_iso, None, reminders)
+    week_cache.invalidate(user_id)
+    await schedule_event_reminders(user_id, event_id)
+
+    await state.clear()
+    await callback.message.answer(
+        f"✅ Eveniment salvat: <b>{title}</b> la <b>{datetime.fromisoformat(start_iso).strftime('%Y-%m-%d %H:%M')}</b>\n"
+        f"Remind: <b>{'OFF' if reminders is None else reminders}</b>",
+        parse_mode="HTML",
+        reply_markup=main_menu_kb(),
+    )
+    await callback.answer()
+
+# ---------- Events list ----------
+def _events_view(rows, has_prev: bool, has_next: bool):
+    lines = ["📌 Evenimente (cu ID):"]
+    for eid, title, start_iso, loc, rem in rows:
+        dt0 = datetime.fromisoformat(start_iso)
+        loc_txt = f" ({loc})" if loc else ""
+        lines.append(f"- #{eid} {dt0.strftime('%Y-%m-%d %H:%M')} {title}{loc_txt}")
+    first, last = rows[0], rows[-1]
+    kb = pager_kb(
+        "evp",
+        f"{first[2]}|{first[0]}" if has_prev else None,
+        f"{last[2]}|{last[0]}" if has_next else None,
+    )
+    return "\n".join(lines), kb
+
+async def _events_page(user_id: int, cursor: tuple[str, int], backward: bool = False):
+    # paging from a listed row: the probe row answers "is there more ahead",
+    # and the cursor row itself lies behind
+    rows = await read(db.list_events_page, user_id, cursor, PAGE_SIZE + 1, backward)
+    more = len(rows) > PAGE_SIZE
+    if more:
+        rows = rows[1:] if backward else rows[:-1]
+    if not rows:
+        return None
+    return _events_view(rows, has_prev=more if backward else True, has_next=more if not backward else True)
+
+@router.message(Command("events"))
+async def cmd_events(message: Message):
+    user_id = await ensure_user_from_msg(message)
+    # start at the first upcoming event; fall back to the most recent past ones.
+    # One query fetches both sides, which also says whether ◀/▶ have anything to show.
+    now_iso = datetime.now(rt.tz).replace(tzinfo=None).isoformat(timespec="seconds")
+    before, after = await read(db.list_events_around, user_id, (now_iso, 0), PAGE_SIZE + 1)
+    if after:
+        text, kb = _events_view(after[:PAGE_SIZE], has_prev=bool(before), has_next=len(after) > PAGE_SIZE)
+    elif before:
+        text, kb = _events_view(before[-PAGE_SIZE:], has_prev=len(before) > PAGE_SIZE, has_next=False)
+    else:
+        await message.answer("Nu ai evenimente salvate.", reply_markup=main_menu_kb())
+        return
+    await message.answer(text, reply_markup=kb)
+
+@callback_router.prefix("evp", parse=page_cursor(str, int))
+async def events_nav(callback: CallbackQuery, state: FSMContext, cb: CallbackData):
+    user_id = callback.from_user.id
+    page = await _events_page(user_id, cb.args.values, backward=cb.args.backward)
+    if not page:
+        await callback.answer("Nu mai sunt evenimente.")
+        return
+    text, kb = page
+    await callback.message.edit_text(text, reply_markup=kb)
+    await callback.answer()
+
+@router.message(Command("archive"))
+async def cmd_archive(message: Message):
+    user_id = await ensure_user_from_msg(message)
+    rows = await read(db.list_archived_events, user_id)
+    if not rows:
+        await message.answer("Arhiva e goală.", reply_markup=main_menu_kb())
+        return
+    lines = ["🗄 Evenimente arhivate (ultimele):"]
+    for eid, title, start_iso, loc, rem in rows:
+        dt0 = datetime.fromisoformat(start_iso)
+        loc_txt = f" ({loc})" if loc else ""
+        lines.append(f"- #{eid} {dt0.strftime('%Y-%m-%d %H:%M')} {title}{loc_txt}")
+    await message.answer("\n".join(lines), reply_markup=main_menu_kb())
+
+# ---------- Uni schedule ----------
+@router.message(F.text == "🎓 Uni schedule")
+async def uni_menu(message: Message):
+    await ensure_user_from_msg(message)
+    await message.answer("🎓 Uni schedule:", reply_markup=uni_menu_kb())
+
+async def _pairs_page(user_id: int, cursor: tuple[str, str, int] | None, backward: bool = False):
+    rows = await read(db.list_pairs_page, user_id, cursor, PAGE_SIZE + 1, backward)
+    more = len(rows) > PAGE_SIZE
+    if more:
+        rows = rows[1:] if backward else rows[:-1]
+    if not rows:
+        return None
+    lines = ["🎓 Perechi (cu ID):"]
+    for pid, dow, st, en, subj, room in rows:
+        room_txt = f" ({room})" if room else ""
+        lines.append(f"- #{pid} {dow}: {st}-{en} {subj}{room_txt}")
+    first, last = rows[0], rows[-1]
+    has_prev = more if backward else cursor is not None
+    has_next = more if not backward else True
+    kb = pager_kb(
+        "upp",
+        f"{first[1]}|{first[2]}|{first[0]}" if has_prev else None,
+        f"{last[1]}|{last[2]}|{last[0]}" if has_next else None,
+    )
+    return "\n".join(lines), kb
+
+@callback_router.exact("uni", "list")
+async def uni_list(callback: CallbackQuery, state: FSMContext, cb: CallbackData):
+    user_id = callback.from_user.id
+    await write(db.ensure_user_tx, user_id, rt.config.tz)
+    page = await _pairs_page(user_id, None)
+    if not page:
+        await callback.message.answer("Nu ai perechi salvate.")
+        await callback.answer()
+        return
+    text, kb = page
+    await callback.message.answer(text, reply_markup=kb)
+    await callback.answer()
+
+@callback_router.prefix("upp", parse=page_cursor(str, str, int))
+async def uni_list_nav(callback: CallbackQuery, state: FSMContext, cb: CallbackData):
+    user_id = callback.from_user.id
+    page = await _pairs_page(user_id, cb.args.values, backward=cb.args.backward)
+    if not page:
+        await callback.answer("Nu mai sunt perechi.")
+        return
+    text, kb = page
+    await callback.message.edit_text(text, reply_markup=kb)
+    await callback.answer()
+
+@callback_router.exact("uni", "add")
+async def uni_add_start(callback: CallbackQuery, state: FSMContext, cb: CallbackData):
+    await state.set_state(UniWizard.mode)
+    await state.update_data(mode="add")
+    await state.set_state(UniWizard.waiting_dow)
+    await callback.message.answer("Alege ziua:", reply_markup=dow_kb("udow"))
+    await callback.answer()
+
+@callback_router.exact("uni", "edit")
+async def uni_edit_start(callback: CallbackQuery, state: FSMContext, cb: CallbackData):
+    await state.set_state(UniWizard.waiting_pair_id)
+    await state.update_data(mode="edit")
+    await callback.message.answer("✏️ Trimite ID-ul perechii pe care vrei s-o modifici (ex: 12).")
+    await callback.answer()
+
+@router.message(UniWizard.waiting_pair_id)
+async def uni_edit_pair_id(message: Message, state: FSMContext):
+    await ensure_user_from_msg(message)
+    txt = (message.text or "").strip()
+    if not txt.isdigit():
+        await message.answer("❌ Trimite un ID numeric (ex: 12).")
+        return
+    await state.update_data(pair_id=int(txt))
+    await state.set_state(UniWizard.waiting_dow)
+    await message.answer("Alege noua zi:", reply_markup=dow_kb("udow"))
+
+@callback_router.prefix("udow", state=UniWizard.waiting_dow)
+async def uni_dow(callback: CallbackQuery, state: FSMContext, cb: CallbackData):
+    dow = cb.action
+    await state.update_data(dow=dow)
+    await state.set_state(UniWizard.waiting_start)
+    await callback.message.answer("Ora început (HH:MM). Ex: 08:30")
+    await callback.answer()
+
+@router.message(UniWizard.waiting_start)
+async def uni_start_time(message: Message, state: FSMContext):
+    t = (message.text or "").strip()
+    if not _valid_time(t):
+        await message.answer("❌ Ora invalidă. Format: HH:MM (ex: 08:30)")
+        return
+    await state.update_data(start=t)
+    await state.set_state(UniWizard.waiting_end)
+    await message.answer("Ora sfârșit (HH:MM). Ex: 10:00")
+
+@router.message(UniWizard.waiting_end)
+async def uni_end_time(message: Message, state: FSMContext):
+    t = (message.text or "").strip()
+    if not _valid_time(t):
+        await message.answer("❌ Ora invalidă. Format: HH:MM (ex: 10:00)")
+        return
+    # an empty or inverted pair would be saved but never show up in the week view
+    st = (await state.get_data())["start"]
+    if datetime.strptime(t, "%H:%M") <= datetime.strptime(st, "%H:%M"):
+        await message.answer(f"❌ Ora de sfârșit trebuie să fie după {st}.")
+        return
+    await state.update_data(end=t)
+    await state.set_state(UniWizard.waiting_subject_room)
+    await message.answer("Scrie materia și (opțional) sala. Ex: Matematica sala204")
+
+@router.message(UniWizard.waiting_subject_room)
+async def uni_subject_room(message: Message, state: FSMContext):
+    user_id = await ensure_user_from_msg(message)
+    txt = (message.text or "").strip()
+    if not txt:
+        await message.answer("❌ Scrie măcar materia.")
+        return
+    parts = txt.split()
+    subject = parts[0]
+    room = " ".join(parts[1:]) if len(parts) > 1 else None
+
+    data = await state.get_data()
+    mode = data.get("mode", "add")
+    dow = data["dow"]
+    st = data["start"]
+    en = data["end"]
+
+    # pairs repeat weekly, so only other pairs are a stable conflict
+    week_start = week_range(datetime.now(rt.tz).date())[0]
+    d = week_start + timedelta(days=DOWS.index(dow))
+    conflicts = await find_conflicts(
+        user_id,
+        datetime.combine(d, datetime.strptime(st, "%H:%M").time()),
+        datetime.combine(d, datetime.strptime(en, "%H:%M").time()),
+        kinds=("pair",),
+        skip=("pair", data.get("pair_id")) if mode == "edit" else None,
+    )
+    warn = "\n\n" + fmt_conflicts(conflicts) if conflicts else ""
+
+    if mode == "edit":
+        pair_id = data.get("pair_id")
+        ok = await write(db.update_pair_tx, user_id, pair_id, dow, st, en, subject, room)
+        week_cache.invalidate(user_id)
+        await message.answer(("✅ Pereche modificată." + warn) if ok else "❌ Nu am găsit perechea cu acest ID.", reply_markup=main_menu_kb())
+    else:
+        pid = await write(db.add_pair_tx, user_id, dow, st, en, subject, room)
+        week_cache.invalidate(user_id)
+        await message.answer(f"✅ Pereche adăugată (#{pid}).{warn}", reply_markup=main_menu_kb())
+
+    await state.clear()
+
+@callback_router.exact("uni", "del")
+async def uni_del_start(callback: CallbackQuery, state: FSMContext, cb: CallbackData):
+    await state.set_state(DeleteById.waiting_pair_id)
+    await callback.message.answer("🗑 Trimite ID-ul perechii de șters (ex: 12).")
+    await callback.answer()
+
+@router.message(DeleteById.waiting_pair_id)
+async def uni_del_pair_id(message: Message, state: FSMContext):
+    user_id = await ensure_user_from_msg(message)
+    txt = (message.text or "").strip()
+    if not txt.isdigit():
+        await message.answer("❌ ID invalid. Exemplu: 12")
+        return
+    ok = await write(db.delete_pair_tx, user_id, int(txt))
+    week_cache.invalidate(user_id)
+    await state.clear()
+    await message.answer("✅ Șters." if ok else "❌ Nu am găsit perechea cu acest ID.", reply_markup=main_menu_kb())
+
+@callback_router.exact("uni", "clear")
+async def uni_clear(callback: CallbackQuery, state: FSMContext, cb: CallbackData):
+    user_id = callback.from_user.id
+    await write(db.ensure_user_tx, user_id, rt.config.tz)
+    n = await write(db.clear_pairs_tx, user_id)
+    week_cache.invalidate(user_id)
+    await callback.message.answer(f"✅ Orar șters. Perechi eliminate: {n}", reply_markup=main_menu_kb())
+    await callback.answer()
+
+# ---------- Delete menu ----------
+@router.message(F.text == "🗑 Delete")
+async def delete_menu(message: Message):
+    await ensure_user_from_msg(message)
+    await message.answer("🗑 Ștergere:", reply_markup=delete_kb())
+
+@callback_router.exact("del", "event")
+async def del_event_start(callback: CallbackQuery, state: FSMContext, cb: CallbackData):
+    await state.set_state(DeleteById.waiting_event_id)
+    await callback.message.answer("Trimite ID-ul eventului de șters (ex: 3).")
+    await callback.answer()
+
+@router.message(DeleteById.waiting_event_id)
+async def del_event_id(message: Message, state: FSMContext):
+    user_id = await ensure_user_from_msg(message)
+    txt = (message.text or "").strip()
+    if not txt.isdigit():
+        await message.answer("❌ ID invalid. Exemplu: 3")
+        return
+    ok = await write(db.delete_event_tx, user_id, int(txt))
+    week_cache.invalidate(user_id)
+    await state.clear()
+    await message.answer("✅ Event șters." if ok else "❌ Nu am găsit eventul cu acest ID.", reply_markup=main_menu_kb())
+
+@callback_router.exact("del", "pair")
+async def del_pair_start(callback: CallbackQuery, state: FSMContext, cb: CallbackData):
+    await state.set_state(DeleteById.waiting_pair_id)
+    await callback.message.answer("Trimite ID-ul perechii de șters (ex: 12).")
+    await callback.answer()
+
+@callback_router.exact("del", "clearpairs")
+async def del_clear_pairs(callback: CallbackQuery, state: FSMContext, cb: CallbackData):
+    user_id = callback.from_user.id
+    await write(db.ensure_user_tx, user_id, rt.config.tz)
+    n = await write(db.clear_pairs_tx, user_id)
+    week_cache.invalidate(user_id)
+    await callback.message.answer(f"✅ Orar șters. Perechi eliminate: {n}", reply_markup=main_menu_kb())
+    await callback.answer()
+
+# Commands
+@router.message(Command("stats"))
+async def cmd_stats(message: Message):
+    if message.from_user.id not in rt.config.admin_ids:
+        return
+    await message.answer(f"📊 Stats\n\n{metrics.render()}")
+
+@router.message(Command("profile"))
+async def cmd_profile(message: Message):
+    if message.from_user.id not in rt.config.admin_ids:
+        return
+    parts = (message.text or "").split()
+    seconds = min(int(parts[1]), 300) if len(parts) > 1 and parts[1].isdigit() else 30
+
+    async def run():
+        res = await profile_for(seconds, rt.config.profile_dir)
+        if res is None:
+            await message.answer("⏳ Un profil rulează deja.")
+            return
+        path, top = res
+        await message.answer(f"✅ Profil salvat: {path}\n\n<pre>{html.escape(top[:3500])}</pre>", parse_mode="HTML")
+
+    # run outside the update so this chat's isolation lock is not held for `seconds`;
+    # a fresh context keeps it off this update's trace, which is logged long before
+    task = asyncio.create_task(run(), context=contextvars.Context())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    await message.answer(f"🔬 Profilez {seconds}s…")
+
+@router.message(Command("deleteevent"))
+async def cmd_deleteevent(message: Message):
+    user_id = await ensure_user_from_msg(message)
+    parts = (message.text or "").split()
+    if len(parts) != 2 or not parts[1].isdigit():
+        await message.answer("Format: /deleteevent 3")
+        return
+    ok = await write(db.delete_event_tx, user_id, int(parts[1]))
+    week_cache.invalidate(user_id)
+    await message.answer("✅ Event șters." if ok else "❌ Nu am găsit eventul.")
+
+@router.message(Command("deletepair"))
+async def cmd_deletepair(message: Message):
+    user_id = await ensure_user_from_msg(message)
+    parts = (message.text or "").split()
+    if len(parts) != 2 or not parts[1].isdigit():
+        await message.answer("Format: /deletepair 12")
+        return
+    ok = await write(db.delete_pair_tx, user_id, int(parts[1]))
+    week_cache.invalidate(user_id)
+    await message.answer("✅ Pereche ștearsă." if ok else "❌ Nu am găsit perechea.")
+
+@router.message(Command("clearpairs"))
+async def cmd_clearpairs(message: Message):
+    user_id = await ensure_user_from_msg(message)
+    n = await write(db.clear_pairs_tx, user_id)
+    week_cache.invalidate(user_id)
+    await message.answer(f"✅ Orar șters. Perechi eliminate: {n}")
@@ -0,0 +1,117 @@
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from heapq import merge
+from typing import Iterable
+
+from .schedule_logic import shift_for_date
+
+EVENT_DEFAULT_DURATION = timedelta(hours=1)
+DOWS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+@dataclass(frozen=True)
+class Interval:
+    start: datetime
+    end: datetime
+    kind: str  # "shift" | "pair" | "event"
+    ref: int | None = None
+    label: str = ""
+    detail: str = ""  # pair room, shown by the calendar view
+
+def shift_intervals(anchor: date, week_start: date) -> list[Interval]:
+    out = []
+    # start one day early: a Sunday night shift runs into Monday morning
+    for i in range(-1, 7):
+        s = shift_for_date(anchor, week_start + timedelta(days=i))
+        if s.start:
+            out.append(Interval(s.start, s.end, "shift", None, s.kind))
+    return out
+
+def pair_intervals(week_start: date, pairs) -> list[Interval]:
+    out = []
+    for pid, dow, st, en, subj, room in pairs:
+        if dow not in DOWS:
+            continue
+        d = week_start + timedelta(days=DOWS.index(dow))
+        try:
+            start = datetime.combine(d, datetime.strptime(st, "%H:%M").time())
+            end = datetime.combine(d, datetime.strptime(en, "%H:%M").time())
+        except ValueError:
+            continue
+        if end > start:
+            out.append(Interval(start, end, "pair", pid, subj, room or ""))
+    out.sort(key=lambda iv: iv.start)
+    return out
+
+def event_intervals(events, duration: timedelta = EVENT_DEFAULT_DURATION) -> list[Interval]:
+    out = []
+    for eid, title, start_iso, *_ in events:
+        start = datetime.fromisoformat(start_iso)
+        out.append(Interval(start, start + duration, "event", eid, title))
+    out.sort(key=lambda iv: iv.start)
+    return out
+
+class IntervalIndex:
+    def __init__(self, intervals: Iterable[Interval]):
+        # intervals must come sorted by start
+        self.intervals = list(intervals)
+        self._starts = [iv.start for iv in self.intervals]
+        self._max_len = max((iv.end - iv.start for iv in self.intervals), default=timedelta(0))
+        busy: list[list[datetime]] = []
+        for iv in self.intervals:
+            if busy and iv.start <= busy[-1][1]:
+                if iv.end > busy[-1][1]:
+                    busy[-1][1] = iv.end
+            else:
+                busy.append([iv.start, iv.end])
+        self.busy = [(s, e) for s, e in busy]
+        self._busy_ends = [e for _, e in self.busy]
+
+    @classmethod
+    def build(cls, anchor: date, week_start: date, pairs, events) -> "IntervalIndex":
+        return cls(merge(
+            shift_intervals(anchor, week_start),
+            pair_intervals(week_start, pairs),
+            event_intervals(events),
+            key=lambda iv: iv.start,
+        ))
+
+    def overlapping(self, start: datetime, end: datetime) -> list[Interval]:
+        lo = bisect_left(self._starts, start - self._max_len)
+        hi = bisect_left(self._starts, end)
+        return [iv for iv in self.intervals[lo:hi] if iv.end > start]
+
+    def free_slots(self, start: datetime, end: datetime, min_len: timedelta) -> list[tuple[datetime, datetime]]:
+        out = []
+        cur = start
+        for bs, be in self.busy[bisect_right(self._busy_ends, start):]:
+            if bs >= end:
+                break
+            if bs - cur >= min_len:
+                out.append((cur, bs))
+            cur = max(cur, be)
+        if end - cur >= min_len:
+            out.append((cur, end))
+        return out
+
+class WeekIndexCache:
+    def __init__(self, max_users: int = 1024):
+        self.max_users = max_users
+        self._users: OrderedDict[int, dict[date, IntervalIndex]] = OrderedDict()
+
+    def get(self, user_id: int, week_start: date) -> IntervalIndex | None:
+        weeks = self._users.get(user_id)
+        if weeks is None:
+            return None
+        self._users.move_to_end(user_id)
+        return weeks.get(week_start)
+
+    def put(self, user_id: int, week_start: date, index: IntervalIndex):
+        self._users.setdefault(user_id, {})[week_start] = index
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        self._users.pop(user_id, None)
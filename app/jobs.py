@@ -0,0 +1,202 @@
+import asyncio
+import logging
+from datetime import datetime, date, timedelta
+
+import pytz
+
+from . import db, runtime as rt
+from .schedule_logic import shift_for_date, dow_str
+from .tracing import traced
+from .writer import read, write
+
+log = logging.getLogger(__name__)
+
+@traced("sched.event_reminders")
+async def schedule_event_reminders(user_id: int, event_id: int):
+    row = await read(db.get_event_offsets, user_id, event_id)
+    if row:
+        _schedule_event(user_id, event_id, row[0], row[1], datetime.now(rt.tz).replace(tzinfo=None))
+
+def _schedule_event(user_id: int, event_id: int, start_iso: str, minutes: tuple[int, ...], now_naive: datetime):
+    if not minutes:
+        return
+    event_dt = datetime.fromisoformat(start_iso)
+    for m in minutes:
+        r_dt = event_dt - timedelta(minutes=m)
+        if r_dt <= now_naive:
+            continue
+        job_id = f"remE:{user_id}:{event_id}:{int(r_dt.timestamp())}"
+        if rt.scheduler.get_job(job_id):
+            continue
+        rt.scheduler.add_job(
+            send_event_reminder,
+            "date",
+            id=job_id,
+            run_date=rt.tz.localize(r_dt),
+            args=[user_id, event_id],
+            misfire_grace_time=3600,
+        )
+
+async def send_event_reminder(user_id: int, event_id: int):
+    row = await read(db.get_event, user_id, event_id)
+    if not row:
+        return
+    _, title, start_iso, loc, reminders_str = row
+    event_dt = datetime.fromisoformat(start_iso)
+    await rt.reminder_coalescer.add(user_id, f"⏰ Reminder (event): {title}\n🗓 {event_dt.strftime('%Y-%m-%d %H:%M')}")
+
+async def schedule_today_uni_reminders():
+    for user_id, user_tz, lead_mins in db.list_uni_leads():
+        try:
+            tz_u = pytz.timezone(user_tz or rt.config.tz)
+        except Exception:
+            tz_u = rt.tz
+
+        today_u = datetime.now(tz_u).date()
+        dow = dow_str(today_u)
+
+        pairs = [p for p in db.list_pairs(user_id) if p[1] == dow]
+        if not pairs:
+            continue
+
+        lead = timedelta(minutes=lead_mins)
+
+        for pid, _, st, en, subj, room in pairs:
+            try:
+                start_time = datetime.strptime(st, "%H:%M").time()
+            except ValueError:
+                continue
+            pair_start = datetime.combine(today_u, start_time)
+            remind_at = pair_start - lead
+
+            now_naive = datetime.now(tz_u).replace(tzinfo=None)
+            if remind_at <= now_naive:
+                continue
+
+            job_id = f"remU:{user_id}:{today_u.isoformat()}:{pid}:{int(remind_at.timestamp())}"
+            if rt.scheduler.get_job(job_id):
+                continue
+
+            rt.scheduler.add_job(
+                send_uni_reminder,
+                "date",
+                id=job_id,
+                run_date=tz_u.localize(remind_at),
+                args=[user_id, pid, subj, st, en, room],
+                misfire_grace_time=1800,
+            )
+
+def reminder_due_soon(user_id: int, window: float) -> bool:
+    # another event/uni reminder job for this user firing within `window` seconds?
+    horizon = datetime.now(rt.tz) + timedelta(seconds=window)
+    for job in rt.scheduler.get_jobs():
+        if (
+            job.func in (send_event_reminder, send_uni_reminder)
+            and job.args and job.args[0] == user_id
+            and job.next_run_time is not None and job.next_run_time <= horizon
+        ):
+            return True
+    return False
+
+async def send_uni_reminder(user_id: int, pair_id: int, subj: str, st: str, en: str, room: str):
+    room_txt = f" ({room})" if room else ""
+    await rt.reminder_coalescer.add(user_id, f"🎓 Reminder (uni): #{pair_id} {st}-{en} {subj}{room_txt}")
+
+async def nightly_uni_check():
+    with db.get_conn() as conn:
+        users = conn.execute("SELECT user_id, timezone FROM users").fetchall()
+
+    for user_id, user_tz in users:
+        try:
+            tz_u = pytz.timezone(user_tz or rt.config.tz)
+        except Exception:
+            tz_u = rt.tz
+
+        now_u = datetime.now(tz_u)
+        tomorrow = now_u.date() + timedelta(days=1)
+
+        anchor_str = db.get_job_anchor(user_id)
+        if not anchor_str:
+            anchor_str = now_u.date().isoformat()
+            await write(db.set_job_anchor_tx, user_id, anchor_str)
+        anchor = date.fromisoformat(anchor_str)
+
+        kind = shift_for_date(anchor, tomorrow).kind
+        if kind not in ("OFF_DAY_1", "OFF_DAY_2"):
+            continue
+
+        dow = dow_str(tomorrow)
+        pairs = [p for p in db.list_pairs(user_id) if p[1] == dow]
+        if not pairs:
+            continue
+
+        lines = ["✅ Mâine ești LIBER și ai universitate:"]
+        for pid, _, st, en, subj, room in pairs:
+            room_txt = f" ({room})" if room else ""
+            lines.append(f"🎓 #{pid} {st}-{en} {subj}{room_txt}")
+        await rt.bot.send_message(user_id, "\n".join(lines))
+
+async def retention_job():
+    cutoff = datetime.now(rt.tz).replace(tzinfo=None) - timedelta(days=rt.config.event_retention_days)
+    moved = await asyncio.to_thread(db.archive_events_before, cutoff.isoformat(timespec="seconds"))
+    reclaimed, page_size = await asyncio.to_thread(db.vacuum_and_analyze)
+    log.info(
+        "retention: archived %d events older than %s, reclaimed %d pages (%d KiB)",
+        moved, cutoff.date().isoformat(), reclaimed, reclaimed * page_size // 1024,
+    )
+
+async def backup_job():
+    from . import backup
+
+    cfg = rt.config
+    report = await asyncio.to_thread(
+        backup.snapshot, cfg.backup_dir, cfg.backup_keep, cfg.backup_compress, cfg.backup_pages_per_step,
+    )
+    log.info(
+        "backup (%s): %d pages in %d steps (%d pages/step, %d restarts) in %.2fs -> %s (%d KiB)",
+        report.method, report.pages, report.steps, report.pages_per_step, report.restarts,
+        report.seconds, report.path, report.size // 1024,
+    )
+
+def install(scheduler):
+    from apscheduler.triggers.cron import CronTrigger
+
+    scheduler.add_job(
+        nightly_uni_check,
+        CronTrigger(hour=20, minute=0),
+        id="nightly_uni_check",
+        replace_existing=True,
+        misfire_grace_time=3600,
+    )
+
+    scheduler.add_job(
+        schedule_today_uni_reminders,
+        CronTrigger(hour=0, minute=5),
+        id="schedule_today_uni_reminders",
+        replace_existing=True,
+        misfire_grace_time=3600,
+    )
+
+    scheduler.add_job(
+        retention_job,
+        CronTrigger(hour=3, minute=30),
+        id="retention_job",
+        replace_existing=True,
+        misfire_grace_time=3600,
+    )
+
+    scheduler.add_job(
+        backup_job,
+        CronTrigger(hour=4, minute=0),
+        id="backup_job",
+        replace_existing=True,
+        misfire_grace_time=3600,
+    )
+
+async def rehydrate():
+    await schedule_today_uni_reminders()
+
+    # one indexed scan over upcoming events with their precomputed offsets
+    now_naive = datetime.now(rt.tz).replace(tzinfo=None)
+    for uid, eid, start_iso, minutes in db.list_upcoming_event_offsets(now_naive.isoformat(timespec="seconds")):
+        _schedule_event(uid, eid, start_iso, minutes, now_naive)
@@ -0,0 +1,21 @@
+from collections import defaultdict
+
+_counters: dict[str, int] = defaultdict(int)
+_gauges: dict[str, float] = {}
+
+def inc(name: str, n: int = 1):
+    _counters[name] += n
+
+def set_gauge(name: str, value: float):
+    _gauges[name] = value
+
+def snapshot() -> dict[str, float]:
+    out: dict[str, float] = dict(_counters)
+    out.update(_gauges)
+    return out
+
+def render() -> str:
+    snap = snapshot()
+    if not snap:
+        return "(no metrics yet)"
+    return "\n".join(f"{k}: {v}" for k, v in sorted(snap.items()))
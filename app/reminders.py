@@ -1,25 +1,29 @@
-from datetime import datetime, timedelta
+from functools import lru_cache
 import re
 
-def parse_reminders(s: str | None) -> list[timedelta]:
-    if not s:
-        return []
-    parts = [p.strip().lower() for p in s.split(",") if p.strip()]
-    out: list[timedelta] = []
-    for p in parts:
+_UNIT_MINUTES = {"d": 1440, "h": 60, "m": 1}
+
+@lru_cache(maxsize=256)
+def reminder_minutes(s: str | None, strict: bool = False) -> tuple[int, ...]:
+    # "30m,1d" -> (1440, 30); "off"/empty -> (). strict=True rejects unknown tokens
+    # (used at write time); the lenient form skips them like the old parser did.
+    if not s or s.strip().lower() == "off":
+        return ()
+    out = set()
+    for p in (p.strip().lower() for p in s.split(",")):
+        if not p:
+            continue
         m = re.fullmatch(r"(\d+)([dhm])", p)
         if not m:
+            if strict:
+                raise ValueError(f"reminder invalid: {p!r} (ex: 30m, 3h, 1d)")
             continue
-        n = int(m.group(1))
-        unit = m.group(2)
-        if unit == "d":
-            out.append(timedelta(days=n))
-        elif unit == "h":
-            out.append(timedelta(hours=n))
-        else:
-            out.append(timedelta(minutes=n))
-    out.sort(reverse=True)
-    return out
+        out.add(int(m.group(1)) * _UNIT_MINUTES[m.group(2)])
+    return tuple(sorted(out, reverse=True))
+
+def encode_minutes(minutes: tuple[int, ...]) -> str | None:
+    return ",".join(map(str, minutes)) if minutes else None
 
-def reminder_times(event_dt: datetime, reminders: list[timedelta]) -> list[datetime]:
-    return [event_dt - r for r in reminders]
+@lru_cache(maxsize=256)
+def decode_minutes(s: str | None) -> tuple[int, ...]:
+    return tuple(int(x) for x in s.split(",")) if s else ()
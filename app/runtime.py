@@ -0,0 +1,18 @@
+# Objects shared by handlers and scheduler jobs. They are bound by
+# app.main.create_app() (and the CLI), so importing handlers/jobs needs
+# neither a token nor a live Bot/scheduler.
+from .config import Config
+
+config = Config()
+tz = None
+bot = None
+scheduler = None
+reminder_coalescer = None
+writer = None
+
+def configure(cfg: Config):
+    global config, tz
+    import pytz
+
+    config = cfg
+    tz = pytz.timezone(cfg.tz)
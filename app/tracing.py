@@ -0,0 +1,104 @@
+import asyncio
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+class Span:
+    __slots__ = ("name", "start", "end", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.children: list["Span"] = []
+
+    @property
+    def ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def render(self, depth: int = 0) -> list[str]:
+        lines = [f"{'  ' * depth}{self.name} {self.ms:.1f} ms"]
+        for child in self.children:
+            lines.extend(child.render(depth + 1))
+        return lines
+
+# None outside of a traced update, so span()/traced() cost one ContextVar.get()
+_current: ContextVar[Span | None] = ContextVar("trace_span", default=None)
+
+@contextmanager
+def span(name: str):
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    s = Span(name)
+    parent.children.append(s)
+    token = _current.set(s)
+    try:
+        yield s
+    finally:
+        s.end = time.perf_counter()
+        _current.reset(token)
+
+def traced(name: str):
+    def deco(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                if _current.get() is None:
+                    return await fn(*args, **kwargs)
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+@contextmanager
+def trace(name: str, slow_ms: float):
+    root = Span(name)
+    token = _current.set(root)
+    try:
+        yield root
+    finally:
+        root.end = time.perf_counter()
+        _current.reset(token)
+        if root.ms >= slow_ms:
+            log.warning("slow update (%.1f ms >= %.0f ms):\n%s", root.ms, slow_ms, "\n".join(root.render()))
+
+_profiling = False
+
+async def profile_for(seconds: float, out_dir: str, top: int = 15) -> tuple[str, str] | None:
+    # cProfile over the whole event-loop thread for `seconds`; None if one is already running
+    global _profiling
+    if _profiling:
+        return None
+    _profiling = True
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        prof.disable()
+        _profiling = False
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"profile-{datetime.now():%Y%m%d-%H%M%S}.pstats")
+    prof.dump_stats(path)
+    buf = io.StringIO()
+    pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+    return path, buf.getvalue()
@@ -56,3 +56,12 @@ def dow_kb(prefix: str):
             row.append(InlineKeyboardButton(text=days[j][0], callback_data=f"{prefix}:{days[j][1]}"))
         rows.append(row)
     return InlineKeyboardMarkup(inline_keyboard=rows)
+
+def pager_kb(prefix: str, prev_cursor: str | None, next_cursor: str | None):
+    # cursors are keyset values joined with "|" (see handlers._events_page / handlers._pairs_page)
+    row = []
+    if prev_cursor:
+        row.append(InlineKeyboardButton(text="◀", callback_data=f"{prefix}:prev:{prev_cursor}"))
+    if next_cursor:
+        row.append(InlineKeyboardButton(text="▶", callback_data=f"{prefix}:next:{next_cursor}"))
+    return InlineKeyboardMarkup(inline_keyboard=[row] if row else [])
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import TelegramObject
+
+from . import metrics
+from .tracing import span, trace
+
+class UpdateScheduler:
+    # Caps how many updates are handled at once (polling starts a task per update).
+    # Per-chat ordering for the FSM wizards is aiogram's events_isolation, which
+    # loads the state only after taking the chat's lock (see App.dp).
+    def __init__(self, workers: int = 16):
+        self.workers = workers
+        self._slots = asyncio.Semaphore(workers)
+        self._queued = 0
+
+    async def run(self, fn: Callable[[], Awaitable[Any]]):
+        self._queued += 1
+        metrics.set_gauge("update_queue_depth", self._queued)
+        try:
+            with span("queue.wait"):
+                await self._slots.acquire()
+            try:
+                metrics.inc("updates_processed")
+                return await fn()
+            finally:
+                self._slots.release()
+        finally:
+            self._queued -= 1
+            metrics.set_gauge("update_queue_depth", self._queued)
+
+class UpdateLimitMiddleware(BaseMiddleware):
+    def __init__(self, scheduler: UpdateScheduler):
+        self.scheduler = scheduler
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        return await self.scheduler.run(lambda: handler(event, data))
+
+class TracingMiddleware(BaseMiddleware):
+    # Root span per update; the span tree is logged when it takes >= slow_ms.
+    def __init__(self, slow_ms: float):
+        self.slow_ms = slow_ms
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        name = f"update {getattr(event, 'update_id', '?')} {getattr(event, 'event_type', type(event).__name__)}"
+        with trace(name, self.slow_ms):
+            return await handler(event, data)
+
+class TracingRequestMiddleware(BaseRequestMiddleware):
+    async def __call__(self, make_request, bot, method):
+        with span(f"api.{type(method).__name__}"):
+            return await make_request(bot, method)
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from . import db, metrics, runtime as rt
+from .tracing import span
+
+log = logging.getLogger(__name__)
+
+Op = Callable[..., Any]
+
+class WriteBatcher:
+    # Write-behind group commit: callers queue (op, args) and await a future;
+    # a single writer task runs whatever piled up (up to max_batch, waiting at
+    # most max_delay for stragglers) in ONE transaction on its own thread and
+    # connection, then resolves every future after COMMIT. Each op runs under
+    # a SAVEPOINT so one failing write does not take the rest of the batch down.
+    def __init__(self, max_batch: int = 64, max_delay: float = 0.005):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._conn: sqlite3.Connection | None = None
+        self._task: asyncio.Task | None = None
+        self._last_batch = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+        if self._conn is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, op: Op, *args) -> Any:
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((op, args, fut))
+        metrics.set_gauge("db_write_queue", self._queue.qsize())
+        return await fut
+
+    def _drain(self, batch: list) -> bool:
+        while len(batch) < self.max_batch and not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is None:
+                return False
+            batch.append(item)
+        return True
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        running = True
+        while running:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            # one loop turn lets writers whose previous write just committed re-queue;
+            # only if fewer showed up than last time do we linger for max_delay
+            await asyncio.sleep(0)
+            running = self._drain(batch)
+            if running and len(batch) < min(self._last_batch, self.max_batch) and self.max_delay > 0:
+                await asyncio.sleep(self.max_delay)
+                running = self._drain(batch)
+            self._last_batch = len(batch)
+            metrics.set_gauge("db_write_queue", self._queue.qsize())
+            try:
+                results = await loop.run_in_executor(self._executor, self._commit, batch)
+            except Exception as e:
+                log.exception("group commit of %d writes failed", len(batch))
+                results = [(fut, None, e) for _, _, fut in batch]
+            for fut, value, exc in results:
+                if fut.done():
+                    continue
+                if exc is not None:
+                    fut.set_exception(exc)
+                else:
+                    fut.set_result(value)
+            metrics.inc("db_write_batches")
+            metrics.inc("db_writes", len(batch))
+
+    def _commit(self, batch: list) -> list:
+        if self._conn is None:
+            self._conn = db.connect(isolation_level=None)
+        conn = self._conn
+        results = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for op, args, fut in batch:
+                conn.execute("SAVEPOINT op")
+                try:
+                    value = op(conn, *args)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op")
+                    results.append((fut, None, e))
+                else:
+                    results.append((fut, value, None))
+                conn.execute("RELEASE op")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return results
+
+async def write(op: Op, *args) -> Any:
+    # Goes through the group-commit writer when the app runs one,
+    # otherwise commits on the spot (CLI, scripts).
+    with span(f"db.write:{op.__name__}"):
+        if rt.writer is None:
+            with db.get_conn() as conn:
+                return op(conn, *args)
+        return await rt.writer.submit(op, *args)
+
+async def read(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    # Plain db reads open their own connection per call, so they can run on
+    # the default thread pool instead of stalling every chat on the event loop.
+    return await asyncio.to_thread(fn, *args, **kwargs)
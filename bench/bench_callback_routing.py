@@ -0,0 +1,52 @@
+"""Callback routing cost vs number of registered handlers.
+
+Compares a linear chain of ==/startswith filters (what a list of
+F.data filters costs) with app.callbacks.CallbackRouter.
+
+    python bench/bench_callback_routing.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.callbacks import CallbackRouter  # noqa: E402
+
+async def _noop(*_):
+    pass
+
+def build(n: int):
+    linear = []
+    router = CallbackRouter()
+    for i in range(n):
+        if i % 2:
+            data = f"p{i}:x"
+            linear.append((lambda d, v=data: d == v, _noop))
+            router.exact(f"p{i}", "x")(_noop)
+        else:
+            pref = f"p{i}:"
+            linear.append((lambda d, v=pref: d.startswith(v), _noop))
+            router.prefix(f"p{i}")(_noop)
+    return linear, router
+
+def linear_resolve(linear, data: str):
+    for check, handler in linear:
+        if check(data):
+            return handler
+    return None
+
+def main():
+    print(f"{'handlers':>8} {'linear us':>10} {'router us':>10}")
+    for n in (8, 32, 128, 512):
+        linear, router = build(n)
+        # worst case for the chain: the last registered handler
+        data = f"p{n - 1}:x" if (n - 1) % 2 else f"p{n - 1}:15m"
+        runs = 20000
+        t_lin = timeit.timeit(lambda: linear_resolve(linear, data), number=runs) / runs
+        t_rt = timeit.timeit(lambda: router.resolve(data), number=runs) / runs
+        assert router.resolve(data) is not None
+        print(f"{n:>8} {t_lin * 1e6:>10.2f} {t_rt * 1e6:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Free-slot / overlap lookups on dense weekly schedules.
+
+    python bench/bench_free_slots.py [users]
+"""
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.intervals import DOWS, IntervalIndex  # noqa: E402
+
+WEEK = date(2026, 2, 2)  # a Monday
+PAIRS_PER_DAY = 6
+EVENTS_PER_WEEK = 60
+
+def dense_user(rng: random.Random):
+    pairs, events = [], []
+    pid = 0
+    for dow in DOWS[:6]:
+        for k in range(PAIRS_PER_DAY):
+            pid += 1
+            h = 8 + k * 2
+            pairs.append((pid, dow, f"{h:02d}:00", f"{h + 1:02d}:30", f"subj{pid}", ""))
+    for eid in range(EVENTS_PER_WEEK):
+        dt = datetime.combine(WEEK, datetime.min.time()) + timedelta(minutes=rng.randrange(0, 7 * 24 * 60, 15))
+        events.append((eid, f"ev{eid}", dt.isoformat(timespec="seconds"), "", ""))
+    events.sort(key=lambda r: r[2])
+    anchor = WEEK - timedelta(days=rng.randrange(4))
+    return anchor, pairs, events
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(42)
+    data = [dense_user(rng) for _ in range(users)]
+
+    t0 = time.perf_counter()
+    indexes = [IntervalIndex.build(a, WEEK, p, e) for a, p, e in data]
+    t_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    slots = 0
+    for idx in indexes:
+        for i in range(7):
+            d = WEEK + timedelta(days=i)
+            slots += len(idx.free_slots(datetime.combine(d, datetime.min.time()).replace(hour=8),
+                                        datetime.combine(d, datetime.min.time()).replace(hour=22),
+                                        timedelta(minutes=30)))
+    t_free = time.perf_counter() - t0
+
+    probes = 50
+    t0 = time.perf_counter()
+    for idx in indexes:
+        for k in range(probes):
+            s = datetime.combine(WEEK, datetime.min.time()) + timedelta(hours=k * 3)
+            idx.overlapping(s, s + timedelta(hours=1))
+    t_overlap = time.perf_counter() - t0
+
+    n_iv = sum(len(idx.intervals) for idx in indexes) / users
+    print(f"users={users} intervals/user={n_iv:.0f}")
+    print(f"build         {t_build / users * 1e6:8.1f} us/user")
+    print(f"free (7 days) {t_free / users * 1e6:8.1f} us/user  ({slots / users:.1f} slots)")
+    print(f"overlap query {t_overlap / (users * probes) * 1e6:8.2f} us/query")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Write throughput: commit-per-call vs the group-commit WriteBatcher.
+
+Uses a throwaway database (DB_PATH is overridden).
+
+    python bench/bench_group_commit.py [writes_per_writer]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import db  # noqa: E402
+from app.writer import WriteBatcher  # noqa: E402
+
+async def per_call(writers: int, per_writer: int):
+    async def worker(w):
+        for i in range(per_writer):
+            await asyncio.to_thread(db.add_event, 1, f"w{w}-{i}", "2026-02-05T16:00:00", None, "30m")
+    await asyncio.gather(*(worker(w) for w in range(writers)))
+
+async def batched(writers: int, per_writer: int):
+    batcher = WriteBatcher()
+    batcher.start()
+
+    async def worker(w):
+        for i in range(per_writer):
+            await batcher.submit(db.add_event_tx, 1, f"w{w}-{i}", "2026-02-05T16:00:00", None, "30m")
+    await asyncio.gather(*(worker(w) for w in range(writers)))
+    await batcher.close()
+
+def main():
+    per_writer = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "bench.db")
+        db.init_db()
+        db.ensure_user(1)
+        print(f"{'writers':>7} {'per-call w/s':>13} {'batched w/s':>12}")
+        for writers in (1, 4, 16, 64):
+            n = writers * per_writer
+            t0 = time.perf_counter()
+            asyncio.run(per_call(writers, per_writer))
+            t_call = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            asyncio.run(batched(writers, per_writer))
+            t_batch = time.perf_counter() - t0
+            print(f"{writers:>7} {n / t_call:>13.0f} {n / t_batch:>12.0f}")
+
+if __name__ == "__main__":
+    main()
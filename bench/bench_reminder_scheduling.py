@@ -0,0 +1,72 @@
+"""Per-reminder scheduling cost: regex-parsed strings vs stored minute offsets.
+
+"before" is the old path (re.fullmatch per token + a list of datetimes per
+event); "after" decodes the stored reminder_mins column (memoized) and
+subtracts minutes directly.
+
+    python bench/bench_reminder_scheduling.py
+"""
+import os
+import re
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.reminders import decode_minutes, encode_minutes, reminder_minutes  # noqa: E402
+
+def old_parse(s):
+    parts = [p.strip().lower() for p in s.split(",") if p.strip()]
+    out = []
+    for p in parts:
+        m = re.fullmatch(r"(\d+)([dhm])", p)
+        if not m:
+            continue
+        n = int(m.group(1))
+        unit = m.group(2)
+        if unit == "d":
+            out.append(timedelta(days=n))
+        elif unit == "h":
+            out.append(timedelta(hours=n))
+        else:
+            out.append(timedelta(minutes=n))
+    out.sort(reverse=True)
+    return out
+
+def before(rows, now):
+    n = 0
+    for start_iso, reminders in rows:
+        event_dt = datetime.fromisoformat(start_iso)
+        for r_dt in [event_dt - r for r in old_parse(reminders)]:
+            if r_dt > now:
+                n += 1
+    return n
+
+def after(rows, now):
+    n = 0
+    for start_iso, mins in rows:
+        event_dt = datetime.fromisoformat(start_iso)
+        for m in decode_minutes(mins):
+            if event_dt - timedelta(minutes=m) > now:
+                n += 1
+    return n
+
+def main():
+    choices = ["15m", "30m", "3h", "1d", "30m,1d", "15m,3h,1d"]
+    base = datetime(2026, 3, 1, 8, 0)
+    legacy = [((base + timedelta(hours=i)).isoformat(timespec="seconds"), choices[i % len(choices)]) for i in range(5000)]
+    stored = [(s, encode_minutes(reminder_minutes(r))) for s, r in legacy]
+    now = datetime(2026, 2, 1)
+    reminders = before(legacy, now)
+    assert reminders == after(stored, now)
+
+    runs = 20
+    t_before = timeit.timeit(lambda: before(legacy, now), number=runs) / runs
+    t_after = timeit.timeit(lambda: after(stored, now), number=runs) / runs
+    print(f"events={len(legacy)} reminders={reminders}")
+    print(f"before {t_before / reminders * 1e9:8.0f} ns/reminder")
+    print(f"after  {t_after / reminders * 1e9:8.0f} ns/reminder  ({t_before / t_after:.1f}x)")
+
+if __name__ == "__main__":
+    main()